@@ -12,6 +12,7 @@ from anthropic import AsyncAnthropic
 from anthropic.types import (
     Message,
     MessageParam,
+    TextBlockParam,
     ToolParam,
     ToolResultBlockParam,
     ToolUseBlock,
@@ -19,7 +20,14 @@ from anthropic.types import (
 from loguru import logger
 from pydantic import BaseModel
 
-from app.prompts.agent_jp import CONDENSED_PROMPT, RECOMMEND_MORE_ITEMS_PROMPT, SYSTEM_PROMPT, USER_PROMPT
+from app.prompts.agent_jp import (
+    CONDENSED_PROMPT,
+    RECOMMEND_MORE_ITEMS_PROMPT,
+    SYSTEM_PROMPT_SHAS,
+    USER_PROMPT,
+    build_system_prompt,
+    is_specific_query,
+)
 from app.tools import (
     EvaluateSearchResultTool,
     MarketResearchTool,
@@ -104,7 +112,7 @@ class MercariShoppingAgent:
         messages.append(
             MessageParam(
                 role="user",
-                content=USER_PROMPT.format(query=state.user_query),
+                content=USER_PROMPT.substitute(query=state.user_query),
             )
         )
         self._save_trajectory(messages)
@@ -117,7 +125,7 @@ class MercariShoppingAgent:
         messages.append(
             MessageParam(
                 role="user",
-                content=RECOMMEND_MORE_ITEMS_PROMPT.format(
+                content=RECOMMEND_MORE_ITEMS_PROMPT.substitute(
                     num_items=num_items,
                     num_items_to_recommend=num_items_to_recommend,
                 ),
@@ -164,12 +172,35 @@ class MercariShoppingAgent:
         self._save_trajectory(messages)
         return messages
 
+    def _get_system_prompt(self, query: str) -> list[TextBlockParam]:
+        """Get the system prompt for a query.
+
+        The system prompt never changes between turns, so it is sent as a single block with the cache breakpoint
+        at its end.
+
+        Args:
+            query (str): The user query.
+
+        Returns:
+            list[TextBlockParam]: The system prompt blocks.
+        """
+        query_is_specific = is_specific_query(query)
+        logger.debug(f"System prompt [{SYSTEM_PROMPT_SHAS[query_is_specific][:12]}], specific: {query_is_specific}")
+        return [
+            TextBlockParam(
+                type="text",
+                text=build_system_prompt(query_is_specific),
+                cache_control={"type": "ephemeral"},
+            )
+        ]
+
     @retry(retry_policy)
-    async def _get_llm_response(self, messages: list[MessageParam]) -> Message:
+    async def _get_llm_response(self, messages: list[MessageParam], system: list[TextBlockParam]) -> Message:
         """Get the LLM response.
 
         Args:
             messages (list[MessageParam]): The messages.
+            system (list[TextBlockParam]): The system prompt blocks.
 
         Returns:
             Message: The LLM response.
@@ -181,7 +212,7 @@ class MercariShoppingAgent:
 
         response = await self.client.messages.create(
             model=self.model,
-            system=[{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}],
+            system=system,
             tools=tools,
             messages=messages,
             max_tokens=self.max_tokens,
@@ -190,6 +221,10 @@ class MercariShoppingAgent:
         if isinstance(messages[-1]["content"], list):
             del messages[-1]["content"][-1]["cache_control"]  # type: ignore
 
+        logger.debug(
+            f"Prompt cache: read {response.usage.cache_read_input_tokens} tokens, "
+            f"wrote {response.usage.cache_creation_input_tokens} tokens"
+        )
         return response
 
     def _save_trajectory(self, messages: list[MessageParam]):
@@ -290,11 +325,11 @@ class MercariShoppingAgent:
                 continue
             yield content.text
 
-    async def _is_conversation_too_long(self, messages: list[MessageParam]) -> bool:
+    async def _is_conversation_too_long(self, messages: list[MessageParam], system: list[TextBlockParam]) -> bool:
         """Check if the conversation is too long."""
         response = await self.client.messages.count_tokens(
             model=self.model,
-            system=SYSTEM_PROMPT,
+            system=system,
             messages=messages,
         )
 
@@ -310,7 +345,7 @@ class MercariShoppingAgent:
         condensed_messages = [
             MessageParam(
                 role="user",
-                content=CONDENSED_PROMPT.format(
+                content=CONDENSED_PROMPT.substitute(
                     n_last_messages=self.keep_n_last_messages,
                     previous_messages=json.dumps(messages[-self.keep_n_last_messages :], indent=2),
                     recommended_candidates=recommended_candidates,
@@ -333,6 +368,7 @@ class MercariShoppingAgent:
             list[ItemRecommendation]: The recommended items.
         """
         state = State(user_query=query)
+        system = self._get_system_prompt(query)
         messages: list[MessageParam] = []
         messages = self._add_current_state_to_messages(messages, state)
 
@@ -342,11 +378,11 @@ class MercariShoppingAgent:
             if self._should_stop(state):
                 return state.recommended_items
 
-            if await self._is_conversation_too_long(messages):
+            if await self._is_conversation_too_long(messages, system):
                 messages = self._condense_messages(state, messages)
 
             # 1. Call LLM with current state
-            response = await self._get_llm_response(messages)
+            response = await self._get_llm_response(messages, system)
             messages = self._add_llm_response_to_messages(messages, response)
             self._log_llm_response(response)
 
@@ -437,6 +473,7 @@ class MercariShoppingAgent:
 
         """
         state = State(user_query=query)
+        system = self._get_system_prompt(query)
         messages: list[MessageParam] = []
         messages = self._add_current_state_to_messages(messages, state)
 
@@ -451,7 +488,7 @@ class MercariShoppingAgent:
                 )
                 return
 
-            if await self._is_conversation_too_long(messages):
+            if await self._is_conversation_too_long(messages, system):
                 messages = self._condense_messages(state, messages)
                 yield AgentAction(
                     action="reasoning",
@@ -459,7 +496,7 @@ class MercariShoppingAgent:
                 )
 
             # 1. Call LLM with current state
-            response = await self._get_llm_response(messages)
+            response = await self._get_llm_response(messages, system)
             messages = self._add_llm_response_to_messages(messages, response)
             for message in self._get_llm_response_text(response):
                 yield AgentAction(
@@ -1,5 +1,6 @@
 """Ebay Research."""
 
+import asyncio
 import os
 from typing import Any
 
@@ -12,6 +13,21 @@ from app.types import BasicProductData, MarketIntelligenceResult
 
 STATUS_CODE_OK = 200
 
+# market prices drift, so cached market intelligence expires after a day (in seconds)
+MARKET_INTELLIGENCE_CACHE_TTL = 24 * 60 * 60
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query, so that queries differing only in case or surrounding whitespace share the same market data.
+
+    Args:
+        query (str): The query.
+
+    Returns:
+        str: The normalized query.
+    """
+    return query.strip().lower()
+
 
 class MarketResearch:
     """Market Research."""
@@ -19,6 +35,8 @@ class MarketResearch:
     def __init__(self):
         """Initialize the MarketResearch."""
         self._cache: Cache | None = None
+        self._mercari_search: MercariSearch | None = None
+        self._mercari_search_lock = asyncio.Lock()
 
     async def __aenter__(self) -> "MarketResearch":
         """Enter the context manager.
@@ -36,10 +54,27 @@ class MarketResearch:
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Exit the context manager."""
+        if self._mercari_search:
+            await self._mercari_search.__aexit__(exc_type, exc_val, exc_tb)
+            self._mercari_search = None
+
         if self._cache:
             await self._cache.close()  # type: ignore
             self._cache = None
 
+    async def _get_mercari_search(self) -> MercariSearch:
+        """Get the Mercari search shared by all searches of this instance.
+
+        The browser is only started on the first search, so lookups served from the cache never start it.
+
+        Returns:
+            MercariSearch: The Mercari search.
+        """
+        async with self._mercari_search_lock:
+            if self._mercari_search is None:
+                self._mercari_search = await MercariSearch().__aenter__()
+            return self._mercari_search
+
     async def search(self, query: str) -> list[BasicProductData]:
         """Search the web for the given query.
 
@@ -49,15 +84,15 @@ class MarketResearch:
         Returns:
             list[dict]: The search results.
         """
-        async with MercariSearch() as ms:
-            items = await ms._search_items(query)
+        ms = await self._get_mercari_search()
+        items = await ms._search_items(query)
 
-            return [
-                BasicProductData(
-                    price=item.price,
-                )
-                for item in items
-            ]
+        return [
+            BasicProductData(
+                price=item.price,
+            )
+            for item in items
+        ]
 
     def _parse_price(self, data: dict[str, Any]) -> float:
         """Parse the price from the data.
@@ -78,26 +113,66 @@ class MarketResearch:
 
         return 0
 
-    async def get_market_intelligence(self, query: str) -> MarketIntelligenceResult | None:
-        """Get the market price for the given query.
+    def _get_cache_key(self, query: str) -> str:
+        """Get the cache key of a query.
+
+        Args:
+            query (str): The query.
+
+        Returns:
+            str: The cache key.
+        """
+        return normalize_query(query)
+
+    async def get_cached_market_intelligence(self, query: str) -> MarketIntelligenceResult | None:
+        """Get the market price for the given query from the cache, without searching.
 
         Args:
             query (str): The query to search for.
 
         Returns:
-            MarketIntelligenceResult | None: The market statistics. None if no results found.
+            MarketIntelligenceResult | None: The market statistics. None if the query is not cached.
         """
-        logger.debug(f"Getting market intelligence for: {query}")
-        result = await self._cache.get(query)  # type: ignore
-        if result:
-            logger.debug(f"Market research result found in cache: {query}")
-            return MarketIntelligenceResult.model_validate(result)
+        result = await self._cache.get(self._get_cache_key(query))  # type: ignore
+        if not result:
+            return None
 
+        logger.debug(f"Market research result found in cache: {query}")
+        return MarketIntelligenceResult.model_validate(result)
+
+    async def search_market_intelligence(self, query: str) -> MarketIntelligenceResult | None:
+        """Search for the given query and cache its market price, without checking the cache first.
+
+        Args:
+            query (str): The query to search for.
+
+        Returns:
+            MarketIntelligenceResult | None: The market statistics. None if no results found.
+        """
         results = await self.search(query)
 
         if not results:
             return None
 
         intelligence = research_market_intelligence(results, query)
+        await self._cache.set(  # type: ignore
+            self._get_cache_key(query), intelligence.model_dump(), ttl=MARKET_INTELLIGENCE_CACHE_TTL
+        )
 
         return intelligence
+
+    async def get_market_intelligence(self, query: str) -> MarketIntelligenceResult | None:
+        """Get the market price for the given query.
+
+        Args:
+            query (str): The query to search for.
+
+        Returns:
+            MarketIntelligenceResult | None: The market statistics. None if no results found.
+        """
+        logger.debug(f"Getting market intelligence for: {query}")
+        result = await self.get_cached_market_intelligence(query)
+        if result:
+            return result
+
+        return await self.search_market_intelligence(query)
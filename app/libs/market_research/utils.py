@@ -60,19 +60,21 @@ def _analyze_price_ranges(prices: List[float]) -> PriceRange:
     Returns:
         PriceRange: The price range.
     """
+    # compute every percentile in one pass over a single array instead of converting the prices for each one
+    p10, p25, p40, p75, p90 = np.percentile(prices, [10, 25, 40, 75, 90]).tolist()
     return PriceRange(
         min=min(prices),
         max=max(prices),
         average=statistics.mean(prices),
         median=statistics.median(prices),
         # use quartiles to segment the price range
-        budget_range_max=float(np.percentile(prices, 25)),  # Budget-friendly upper limit
-        mid_range_min=float(np.percentile(prices, 25)),  # Mid-range lower limit
-        mid_range_max=float(np.percentile(prices, 75)),  # Mid-range upper limit
-        premium_range_min=float(np.percentile(prices, 75)),  # Premium lower limit
-        excellent_deal_max=float(np.percentile(prices, 10)),  # Excellent deals threshold
-        good_deal_max=float(np.percentile(prices, 40)),  # Good deals threshold
-        overpriced_min=float(np.percentile(prices, 90)),  # Overpriced threshold
+        budget_range_max=p25,  # Budget-friendly upper limit
+        mid_range_min=p25,  # Mid-range lower limit
+        mid_range_max=p75,  # Mid-range upper limit
+        premium_range_min=p75,  # Premium lower limit
+        excellent_deal_max=p10,  # Excellent deals threshold
+        good_deal_max=p40,  # Good deals threshold
+        overpriced_min=p90,  # Overpriced threshold
     )
 
 
@@ -109,8 +111,7 @@ def _assess_price_volatility(prices: List[float]) -> str:
         return "unknown"
 
     # use Interquartile Range to assess price volatility
-    q1 = np.percentile(prices, 25)
-    q3 = np.percentile(prices, 75)
+    q1, q3 = np.percentile(prices, [25, 75]).tolist()
 
     # Avoid division by zero if all prices are the same
     if (q3 + q1) == 0:
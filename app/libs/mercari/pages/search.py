@@ -3,15 +3,17 @@
 This module contains the Mercari Search Page class.
 """
 
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import json_repair
 from loguru import logger
-from playwright.async_api import Page
 
 from app.exception import SearchNotFoundError
 from app.types import Item
 
+if TYPE_CHECKING:
+    from playwright.async_api import Page
+
 
 class MercariSearchPage:
     """Mercari Search Page.
@@ -19,7 +21,7 @@ class MercariSearchPage:
     Used to search for items on Mercari.
     """
 
-    def __init__(self, page: Page, timeout: int = 30 * 1000):
+    def __init__(self, page: "Page", timeout: int = 30 * 1000):
         """Initialize the Mercari Search Page.
 
         Args:
@@ -5,17 +5,19 @@ This module contains the Mercari Search class.
 
 import asyncio
 import os
+from typing import TYPE_CHECKING
 
 from aiocache import Cache
 from loguru import logger
-from playwright.async_api import Browser, Page, async_playwright
-from playwright_stealth import Stealth
 
 from app.libs.mercari.config import USER_AGENT, VIEWPORT
 from app.libs.mercari.pages.item_detail import MercariItemDetailPage
 from app.libs.mercari.pages.search import MercariSearchPage
 from app.types import Item, ItemDetail
 
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, Page
+
 
 class MercariSearch:
     """Mercari Search.
@@ -32,9 +34,9 @@ class MercariSearch:
         """
         self.headless = headless
         self._playwright = None
-        self._browser: Browser | None = None
+        self._browser: "Browser | None" = None
         self._semaphore = asyncio.Semaphore(max_concurrent_pages)
-        self._manager = Stealth().use_async(async_playwright())
+        self._manager = None
 
     async def __aenter__(self) -> "MercariSearch":
         """Enter the context manager.
@@ -42,7 +44,12 @@ class MercariSearch:
         Returns:
             MercariSearch: The instance of the MercariSearch.
         """
+        # playwright is heavy to import, so only load it when a browser is needed
+        from playwright.async_api import async_playwright  # noqa: PLC0415
+        from playwright_stealth import Stealth  # noqa: PLC0415
+
         logger.debug("Starting browser...")
+        self._manager = Stealth().use_async(async_playwright())
         self._playwright = await self._manager.__aenter__()
         self._browser = await self._playwright.chromium.launch(headless=self.headless)
         self._cache = Cache(
@@ -65,15 +72,16 @@ class MercariSearch:
             await self._browser.close()
             self._browser = None
 
-        if self._playwright:
+        if self._playwright and self._manager:
             await self._manager.__aexit__(exc_type, exc_val, exc_tb)
             self._playwright = None
+            self._manager = None
 
         if self._cache:
             await self._cache.close()  # type: ignore
             self._cache = None
 
-    async def _create_new_page(self) -> Page:
+    async def _create_new_page(self) -> "Page":
         """Create a new page.
 
         Returns:
@@ -4,13 +4,15 @@ This module contains the Mercari Japan Item Detail Page class.
 """
 
 import asyncio
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from loguru import logger
-from playwright.async_api import Page
 
 from app.types import ItemDetail
 
+if TYPE_CHECKING:
+    from playwright.async_api import Page
+
 
 class MercariJPItemDetailPage:
     """Mercari Japan Item Detail Page.
@@ -18,7 +20,7 @@ class MercariJPItemDetailPage:
     Used to get the item detail from the item.
     """
 
-    def __init__(self, page: Page, timeout: int = 10 * 1000, page_ready_timeout: int = 30 * 1000):
+    def __init__(self, page: "Page", timeout: int = 10 * 1000, page_ready_timeout: int = 30 * 1000):
         """Initialize the Mercari Japan Item Detail Page.
 
         Args:
@@ -4,15 +4,17 @@ This module contains the Mercari Japan Search Page class.
 """
 
 import asyncio
-from typing import Literal
+from typing import TYPE_CHECKING, Literal
 
 from loguru import logger
-from playwright.async_api import Locator, Page, TimeoutError
 from price_parser.parser import parse_price
 
 from app.exception import SearchNotFoundError
 from app.types import Item
 
+if TYPE_CHECKING:
+    from playwright.async_api import Locator, Page
+
 
 class MercariJPSearchPage:
     """Mercari Japan Search Page.
@@ -22,7 +24,7 @@ class MercariJPSearchPage:
 
     base_url = "https://jp.mercari.com"
 
-    def __init__(self, page: Page, timeout: int = 30 * 1000):
+    def __init__(self, page: "Page", timeout: int = 30 * 1000):
         """Initialize the Mercari Japan Search Page.
 
         Args:
@@ -142,7 +144,7 @@ class MercariJPSearchPage:
 
         return items
 
-    async def _parse_item(self, item_locator: Locator) -> Item | None:
+    async def _parse_item(self, item_locator: "Locator") -> Item | None:
         """Parse the item data.
 
         Args:
@@ -151,6 +153,8 @@ class MercariJPSearchPage:
         Returns:
             Item: The parsed item.
         """
+        from playwright.async_api import TimeoutError  # noqa: PLC0415
+
         # find url, example: /item/m18276289519
         while True:
             try:
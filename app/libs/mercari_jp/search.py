@@ -5,18 +5,19 @@ This module contains the Mercari Search Japan class.
 
 import asyncio
 import os
-from typing import Literal
+from typing import TYPE_CHECKING, Literal
 
 from aiocache import Cache
 from loguru import logger
-from playwright.async_api import Browser, Page, async_playwright
-from playwright_stealth import Stealth
 
 from app.libs.mercari_jp.config import BROWSER_CONFIG
 from app.libs.mercari_jp.pages.item_detail import MercariJPItemDetailPage
 from app.libs.mercari_jp.pages.search import MercariJPSearchPage
 from app.types import Item, ItemDetail
 
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, Page
+
 
 class MercariJPSearch:
     """Mercari Search Japan.
@@ -33,13 +34,18 @@ class MercariJPSearch:
         """
         self.headless = headless
         self._playwright = None
-        self._browser: Browser | None = None
+        self._browser: "Browser | None" = None
         self._semaphore = asyncio.Semaphore(max_concurrent_pages)
-        self._manager = Stealth().use_async(async_playwright())
+        self._manager = None
 
     async def __aenter__(self):
         """Enter the context manager."""
+        # playwright is heavy to import, so only load it when a browser is needed
+        from playwright.async_api import async_playwright  # noqa: PLC0415
+        from playwright_stealth import Stealth  # noqa: PLC0415
+
         logger.debug("Starting browser...")
+        self._manager = Stealth().use_async(async_playwright())
         self._playwright = await self._manager.__aenter__()
         self._browser = await self._playwright.chromium.launch(headless=self.headless)
         self._cache = Cache(
@@ -56,9 +62,10 @@ class MercariJPSearch:
             await self._browser.close()
             self._browser = None
 
-        if self._playwright:
+        if self._playwright and self._manager:
             await self._manager.__aexit__(exc_type, exc_val, exc_tb)
             self._playwright = None
+            self._manager = None
 
         if self._cache:
             await self._cache.close()  # type: ignore
@@ -69,7 +76,7 @@ class MercariJPSearch:
         if self._cache:
             await self._cache.clear()  # type: ignore
 
-    async def _create_new_page(self) -> Page:
+    async def _create_new_page(self) -> "Page":
         """Create a new page.
 
         Returns:
@@ -172,9 +179,10 @@ class MercariJPSearch:
         """
         items = await self._search_items(query, min_price, max_price, max_items, sort_by, order)
 
+        # the details are fetched concurrently, bounded by the page semaphore; gather keeps the item order
         item_detail_tasks = [self._get_item_detail_with_semaphore(item) for item in items]
         item_details = await asyncio.gather(*item_detail_tasks)
-        for item, item_detail in zip(items, item_details, strict=False):
+        for item, item_detail in zip(items, item_details, strict=True):
             if not item_detail:
                 continue
             item.item_detail = item_detail
@@ -0,0 +1,16 @@
+"""Date helpers for prompts.
+
+Dates interpolated into prompts must have day precision: every call made on the same day then renders a
+byte-identical prompt, which keeps both the provider prompt cache and the in-memory evaluation cache warm.
+"""
+
+from datetime import UTC, datetime
+
+
+def today_bucket() -> str:
+    """Get the current UTC date, truncated to the day.
+
+    Returns:
+        str: The current date in `YYYY-MM-DD` format.
+    """
+    return datetime.now(UTC).strftime("%Y-%m-%d")
@@ -0,0 +1,8 @@
+"""Japanese to English translation rules shared by the prompts that read Mercari Japan item data."""
+
+# ruff: noqa: E501
+
+TRANSLATION_RULES = """**Language & Translation Rules:**
+- **Translate Everything:** All Japanese terms (product names, specifications, colors, etc.) must be translated to English.
+- **Retain Key Identifiers:** Model numbers (e.g., "RTX 3070"), technical specs (e.g., "256GB"), and internationally recognized brand names (e.g., "Apple", "Sony") should be kept in their original form, even if they appear in Japanese text.
+"""
@@ -2,6 +2,9 @@
 
 # ruff: noqa: E501
 
+import hashlib
+from string import Template
+
 SYSTEM_PROMPT = """You are a world-class AI personal shopper. You understand that users need more than just a list of specs; they need to see how a product fits into their life. Your goal is to create a recommendation that is deeply personalized, evidence-based, and transparent about trade-offs.
 
 You will be given the user's original query and a list of candidate items. Your task is to select the top 3 items and present them in a way that helps the user make a confident and quick decision.
@@ -60,14 +63,19 @@ Your final output **must** be a valid JSON array of objects. Each object represe
 If fewer than three items are provided, analyze and return all of them. **Do not** include any introductory text, explanations, or markdown formatting around the final JSON output.
 """
 
-USER_PROMPT = """
+# Hash the system prompt once so the caller can attribute prompt cache hits to a specific prompt version.
+SYSTEM_PROMPT_SHA = hashlib.sha256(SYSTEM_PROMPT.encode()).hexdigest()
+
+USER_PROMPT = Template(
+    """
 Please analyze the following candidate items based on the user query and select the best three.
 
 <UserQuery>
-{user_query}
+${user_query}
 </UserQuery>
 
 <CandidateItems>
-{candidate_items}
+${candidate_items}
 </CandidateItems>
 """
+)
@@ -4,23 +4,31 @@ This tool is used to evaluate the relevance of the search results.
 """
 
 import asyncio
-from datetime import datetime
+import hashlib
+from collections import OrderedDict
 from typing import Type
 
-import json_repair
 from aioretry.retry import retry
 from anthropic import AsyncAnthropic
+from anthropic.types import Message, TextBlockParam
 from loguru import logger
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
 
-from app.prompts.evaluate_item_jp import SYSTEM_PROMPT, USER_PROMPT
+from app.prompts._date import today_bucket
+from app.prompts.evaluate_item_jp import SYSTEM_PROMPT_DATE, SYSTEM_PROMPT_SHA, SYSTEM_PROMPT_STATIC, USER_PROMPT
 from app.types import Item, ItemRelevanceScore, State, Tool, ToolResult
-from app.utils import get_llm_friendly_item, get_llm_friendly_items, retry_policy
+from app.utils import gather_with_progress, get_llm_friendly_item, get_llm_friendly_items, parse_json, retry_policy
+
+# The reply ends at the closing brace of the JSON object; stop on trailing blank lines instead of decoding them.
+STOP_SEQUENCES = ["\n\n\n"]
 
 
 class EvaluateSearchResultToolArgs(BaseModel):
     """Arguments for the evaluate_search_result tool."""
 
+    model_config = ConfigDict(frozen=True)
+    """The model config for the arguments."""
+
     item_ids: list[str] = Field(default_factory=list, description="The IDs of the items to evaluate.")
     """The IDs of the items to evaluate."""
 
@@ -34,7 +42,8 @@ class EvaluateSearchResultTool(Tool):
     description: str = (
         "Evaluate the relevance of the search results. The score will be stored in the `relevance_score` "
         "field of the items. The score is a number between 0 and 1, where 0 is the lowest relevance and 1 is the "
-        "highest relevance. The reasoning will be stored in the `relevance_score_reasoning` field of the items."
+        "highest relevance. The reasoning will be stored in the `relevance_score_reasoning` field of the items. "
+        "Use this to filter down your search results."
     )
     """The description of the tool."""
 
@@ -47,30 +56,224 @@ class EvaluateSearchResultTool(Tool):
     temperature: float = 0.0
     """The temperature to use for the tool."""
 
+    per_item_timeout: float = 30.0
+    """The maximum number of seconds of a single evaluation attempt. A timed out attempt is retried."""
+
+    max_tokens: int = 512
+    """The maximum number of tokens of an evaluation. The reply is a small JSON object with a score and reasoning."""
+
     args_schema: Type[BaseModel] = EvaluateSearchResultToolArgs
     """The arguments schema for the tool."""
 
+    cache_size: int = 1024
+    """The maximum number of evaluation results to keep in memory."""
+
+    use_batch_api: bool = False
+    """Whether to evaluate the items with the Message Batches API. Batches cost half as much, but may take
+    minutes to finish, so this is meant for offline evaluation rather than interactive use."""
+
+    batch_poll_interval: float = 20.0
+    """The interval in seconds between batch status checks."""
+
+    batch_max_retries: int = 2
+    """The maximum number of follow-up batches for the requests that failed in a batch."""
+
+    _cache: OrderedDict[str, ItemRelevanceScore] = PrivateAttr(default_factory=OrderedDict)
+    """The evaluation results, keyed by the hash of the rendered date and user prompts."""
+
+    def _get_system_prompt(self) -> list[TextBlockParam]:
+        """Render the system prompt, once per execution.
+
+        The static rubric is sent first with a cache breakpoint, followed by the date block, so the cached prefix
+        is shared by every evaluation call.
+
+        Returns:
+            list[TextBlockParam]: The system prompt blocks.
+        """
+        return [
+            {
+                "type": "text",
+                "text": SYSTEM_PROMPT_STATIC,
+                "cache_control": {"type": "ephemeral"},
+            },
+            {
+                "type": "text",
+                "text": SYSTEM_PROMPT_DATE.substitute(current_date=today_bucket()),
+            },
+        ]
+
+    def _get_user_prompt(self, state: State, item: Item, system: list[TextBlockParam]) -> tuple[str, str]:
+        """Render the user prompt for an item.
+
+        The evaluation is a pure function of the rendered prompts, so they are hashed into the key of the
+        evaluation cache. Attaching new market research to the item changes the prompt and therefore the cache key.
+
+        Args:
+            state (State): The current state.
+            item (Item): The item to evaluate.
+            system (list[TextBlockParam]): The system prompt blocks.
+
+        Returns:
+            tuple[str, str]: The user prompt and the cache key.
+        """
+        # leave out any previous score so re-evaluating an item hits the cache
+        unscored_item = item.model_copy(update={"relevance_score": None})
+        user_prompt = USER_PROMPT.substitute(
+            item_info=get_llm_friendly_item(unscored_item),
+            user_query=state.user_query,
+            market_research=item.market_research_result.get_llm_friendly_result()
+            if item.market_research_result
+            else "",
+        )
+        date_prompt = system[-1]["text"]
+        key = hashlib.sha256(f"{date_prompt}\n{user_prompt}".encode()).hexdigest()
+        return user_prompt, key
+
+    def _cache_relevance_score(self, key: str, relevance_score: ItemRelevanceScore):
+        """Store an evaluation result in the cache.
+
+        Args:
+            key (str): The cache key of the evaluation.
+            relevance_score (ItemRelevanceScore): The relevance score of the item.
+        """
+        # don't cache failed evaluations so they are retried next time
+        if not relevance_score.reasoning:
+            return
+
+        self._cache[key] = relevance_score
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _evaluate_item(self, state: State, item: Item, system: list[TextBlockParam]) -> ItemRelevanceScore:
+        """Evaluate an item.
+
+        Args:
+            state (State): The current state.
+            item (Item): The item to evaluate.
+            system (list[TextBlockParam]): The system prompt blocks.
+
+        Returns:
+            ItemRelevanceScore: The relevance score of the item.
+        """
+        user_prompt, key = self._get_user_prompt(state, item, system)
+        if key in self._cache:
+            logger.debug(f"Evaluation found in cache: {item.id}")
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        try:
+            relevance_score = await self._get_relevance_score(system, user_prompt)
+        except TimeoutError:
+            # a straggler gets the same empty score as a failed evaluation instead of holding up the others
+            logger.warning(f"Evaluation timed out: {item.id}")
+            return ItemRelevanceScore(score=0.0, reasoning="")
+        self._cache_relevance_score(key, relevance_score)
+        return relevance_score
+
+    async def _evaluate_items_with_batch(
+        self, state: State, items: list[Item], system: list[TextBlockParam]
+    ) -> list[ItemRelevanceScore]:
+        """Evaluate items with a single Message Batches API request.
+
+        Items found in the cache are not submitted, and items with identical prompts are submitted once.
+
+        Args:
+            state (State): The current state.
+            items (list[Item]): The items to evaluate.
+            system (list[TextBlockParam]): The system prompt blocks.
+
+        Returns:
+            list[ItemRelevanceScore]: The relevance scores of the items, in the same order as the items.
+        """
+        prompts = [self._get_user_prompt(state, item, system) for item in items]
+        # results are collected locally; the bounded cache may evict entries while the batch is processed
+        results = {key: self._cache[key] for _, key in prompts if key in self._cache}
+        # the cache key is a sha256 hex digest, which fits the 64 character limit of custom IDs
+        pending = {
+            key: {
+                "custom_id": key,
+                "params": {
+                    "model": self.model,
+                    "max_tokens": self.max_tokens,
+                    "temperature": self.temperature,
+                    "stop_sequences": STOP_SEQUENCES,
+                    "system": system,
+                    "messages": [{"role": "user", "content": user_prompt}],
+                },
+            }
+            for user_prompt, key in prompts
+            if key not in results
+        }
+
+        # failed requests are resubmitted together in a smaller batch rather than retried one by one
+        for attempt in range(self.batch_max_retries + 1):
+            if not pending:
+                break
+
+            batch = await self.client.messages.batches.create(requests=list(pending.values()))  # type: ignore
+            logger.info(f"Submitted evaluation batch {batch.id} with {len(pending)} items (attempt {attempt + 1})")
+            while batch.processing_status != "ended":
+                await asyncio.sleep(self.batch_poll_interval)
+                batch = await self.client.messages.batches.retrieve(batch.id)
+
+            async for entry in await self.client.messages.batches.results(batch.id):
+                if entry.result.type != "succeeded":
+                    logger.error(f"Evaluation batch request {entry.custom_id} {entry.result.type}")
+                    continue
+                relevance_score = self._parse_relevance_score(entry.result.message)
+                results[entry.custom_id] = relevance_score
+                self._cache_relevance_score(entry.custom_id, relevance_score)
+                del pending[entry.custom_id]
+
+        return [results.get(key, ItemRelevanceScore(score=0.0, reasoning="")) for _, key in prompts]
+
     @retry(retry_policy)
-    async def _evaluate_item(self, state: State, item: Item) -> ItemRelevanceScore:
-        """Evaluate an item."""
-        response = await self.client.messages.create(
-            system=SYSTEM_PROMPT.format(current_date=datetime.now().strftime("%Y-%m-%d")),
-            model=self.model,
-            max_tokens=1024,
-            temperature=self.temperature,
-            messages=[
-                {
-                    "role": "user",
-                    "content": USER_PROMPT.format(
-                        item_info=get_llm_friendly_item(item),
-                        user_query=state.user_query,
-                        market_research=item.market_research_result.get_llm_friendly_result()
-                        if item.market_research_result
-                        else "",
-                    ),
-                }
-            ],
+    async def _get_relevance_score(self, system: list[TextBlockParam], user_prompt: str) -> ItemRelevanceScore:
+        """Get the relevance score of an item from the LLM.
+
+        Args:
+            system (list[TextBlockParam]): The system prompt blocks.
+            user_prompt (str): The rendered user prompt for the item.
+
+        Returns:
+            ItemRelevanceScore: The relevance score of the item.
+        """
+        # the timeout applies to each attempt, so a slow attempt is retried instead of using up the retry budget
+        async with (
+            asyncio.timeout(self.per_item_timeout),
+            self.client.messages.stream(
+                system=system,
+                model=self.model,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stop_sequences=STOP_SEQUENCES,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": user_prompt,
+                    }
+                ],
+            ) as stream,
+        ):
+            response = await stream.get_final_message()
+        logger.debug(
+            f"Prompt cache [{SYSTEM_PROMPT_SHA[:12]}]: read {response.usage.cache_read_input_tokens} tokens, "
+            f"wrote {response.usage.cache_creation_input_tokens} tokens"
         )
+        return self._parse_relevance_score(response)
+
+    def _parse_relevance_score(self, response: Message) -> ItemRelevanceScore:
+        """Parse the relevance score from the LLM response.
+
+        Args:
+            response (Message): The LLM response.
+
+        Returns:
+            ItemRelevanceScore: The relevance score of the item.
+        """
+        if response.stop_reason == "max_tokens":
+            logger.warning(f"Evaluation truncated at {self.max_tokens} tokens")
+
         try:
             text = None
             for content in response.content:
@@ -81,7 +284,7 @@ class EvaluateSearchResultTool(Tool):
             if text is None:
                 return ItemRelevanceScore(score=0.0, reasoning="")
 
-            json_data = json_repair.loads(text)
+            json_data = parse_json(text)
             if isinstance(json_data, dict):
                 score = json_data.get("score", 0.0) / 5.0
                 reasoning = json_data.get("reasoning", "")
@@ -96,18 +299,19 @@ class EvaluateSearchResultTool(Tool):
         """Execute the tool."""
         logger.info("Evaluating items")
         logger.debug(f"Evaluating items: {item_ids}")
-        tasks = [self._evaluate_item(state, item) for item in state.search_results if item.id in item_ids]
-        results = await asyncio.gather(*tasks)
+        updated_items = state.get_search_results(item_ids)
+        system = self._get_system_prompt()
+        if self.use_batch_api:
+            results = await self._evaluate_items_with_batch(state, updated_items, system)
+        else:
+            results = await gather_with_progress(
+                "Evaluated items", [self._evaluate_item(state, item, system) for item in updated_items]
+            )
 
-        logger.debug(f"Evaluated scores: {results}")
+        logger.opt(lazy=True).debug("Evaluated scores: {}", lambda: results)
 
-        updated_items = []
-        for item_id, relevance_score in zip(item_ids, results, strict=True):
-            for item in state.search_results:
-                if item.id == item_id:
-                    item.relevance_score = relevance_score
-                    updated_items.append(item)
-                    break
+        for item, relevance_score in zip(updated_items, results, strict=True):
+            item.relevance_score = relevance_score
 
         state.recommended_candidates.extend(updated_items)
         state.remove_duplicate_recommended_candidates()
@@ -121,12 +325,14 @@ class EvaluateSearchResultTool(Tool):
 
     def _get_simplified_tool_response(self, items: list[Item]) -> str:
         """Get the simplified tool response."""
-        text = ""
+        parts = []
         for item in items:
             if item.relevance_score is None:
                 continue
-            text += f"## [{item.name}]({item.item_url})\n"
-            text += f"**Price**: {item.currency} {item.price}\n"
-            text += f"**Relevance Score**: {item.relevance_score.score}\n"
-            text += f"**Relevance Reasoning**: \n\n```\n{item.relevance_score.reasoning}\n```\n"
-        return text
+            parts.append(
+                f"## [{item.name}]({item.item_url})\n"
+                f"**Price**: {item.currency} {item.price}\n"
+                f"**Relevance Score**: {item.relevance_score.score}\n"
+                f"**Relevance Reasoning**: \n\n```\n{item.relevance_score.reasoning}\n```\n"
+            )
+        return "".join(parts)
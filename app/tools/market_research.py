@@ -1,24 +1,37 @@
 """Market Research Tool."""
 
 import asyncio
+import hashlib
+import re
+import time
 from asyncio import Semaphore
+from collections import OrderedDict
 from typing import Type
 
-import json_repair
 from aioretry.retry import retry
 from anthropic import AsyncAnthropic
 from loguru import logger
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
 
-from app.libs.market_research.market_research import MarketResearch
-from app.prompts.market_research_query import SYSTEM_PROMPT, USER_PROMPT
+from app.libs.market_research.market_research import MarketResearch, normalize_query
+from app.prompts.market_research_query import SYSTEM_PROMPT, SYSTEM_PROMPT_SHA, USER_PROMPT
 from app.types import Item, MarketIntelligenceResult, State, Tool, ToolResult
-from app.utils import retry_policy
+from app.utils import gather_with_progress, parse_json, retry_policy
+
+SHORT_DESCRIPTION_LENGTH = 40
+SHORT_NAME_LENGTH = 60
+MODEL_NUMBER_NAME_LENGTH = 80
+
+# an uppercase alphanumeric token with at least one digit, e.g. "RTX3070", "WH-1000XM4" or "256GB"
+MODEL_NUMBER_PATTERN = re.compile(r"\b(?=[A-Z-]*\d)[A-Z0-9]{2,}-?[A-Z0-9]{2,}\b")
 
 
 class MarketResearchToolArgs(BaseModel):
     """Arguments for the market_research tool."""
 
+    model_config = ConfigDict(frozen=True)
+    """The model config for the arguments."""
+
     item_ids: list[str] = Field(
         description="The list of item IDs to research. The item IDs must be results from the `mercari_search` tool."
     )
@@ -31,11 +44,22 @@ class MarketResearchTool(Tool):
     name: str = "market_research"
     """The name of the tool."""
 
-    description: str = "Research the market price of the item that already exists in the search results. The result will be a report of the market price, price strategy, value strategy, expected price, and price volatility."  # noqa: E501
+    description: str = (
+        "Research the market price of items that already exist in the search results, by item ID. The result "
+        "will be a report of the market price, price strategy, value strategy, expected price, and price "
+        "volatility, with prices in USD. Always call this before `evaluate_search_result` to get better "
+        "evaluation scores."
+    )
 
-    concurrent_limit: int = 1
+    concurrent_limit: int = 4
     """The concurrent limit for the market research."""
 
+    requests_per_minute: int = 50
+    """The maximum number of market research requests started per minute."""
+
+    per_query_timeout: float = 60.0
+    """The maximum number of seconds to search a single query, excluding the concurrency and rate limit waits."""
+
     client: AsyncAnthropic
     """The client for the Anthropic API."""
 
@@ -45,30 +69,108 @@ class MarketResearchTool(Tool):
     args_schema: Type[BaseModel] = MarketResearchToolArgs
     """The arguments schema for the tool."""
 
-    @retry(retry_policy)
+    cache_size: int = 512
+    """The maximum number of generated queries to keep in memory."""
+
+    _query_cache: OrderedDict[str, str] = PrivateAttr(default_factory=OrderedDict)
+    """The generated queries, keyed by the hash of the rendered user prompt."""
+
+    _next_request_at: float = PrivateAttr(default=0.0)
+    """The earliest monotonic time at which the next market research request may start."""
+
+    def _is_name_usable_as_query(self, item: Item) -> bool:
+        """Check whether the item name can be used as the market research query as-is.
+
+        The market research searches in English, so only names without Japanese text qualify. Such a name is
+        usable if it names a model number, or if it is short and the description adds little.
+
+        Args:
+            item (Item): The item to check.
+
+        Returns:
+            bool: True if the item name can be used as the query, False otherwise.
+        """
+        if not item.name.isascii():
+            return False
+
+        if len(item.name) < MODEL_NUMBER_NAME_LENGTH and MODEL_NUMBER_PATTERN.search(item.name):
+            return True
+
+        description = item.item_detail.description if item.item_detail else ""
+        return len(description) < SHORT_DESCRIPTION_LENGTH and len(item.name) < SHORT_NAME_LENGTH
+
     async def _get_query(self, item: Item) -> str:
         """Get the query for the market research.
 
+        If the item name is already a usable English query, the LLM is skipped. Otherwise the query only depends
+        on the item name, description and categories, so it is cached by the hash of the rendered prompt.
+
         Args:
             item (Item): The item to get the query for.
 
         Returns:
             str: The query for the market research. Return the item name if the query is not found.
         """
-        response = await self.client.messages.create(
-            system=SYSTEM_PROMPT,
+        if self._is_name_usable_as_query(item):
+            return item.name
+
+        user_prompt = USER_PROMPT.substitute(
+            item_name=item.name,
+            item_description=item.item_detail.description if item.item_detail else "",
+            item_categories=item.item_detail.categories if item.item_detail else "",
+        )
+        key = hashlib.sha256(user_prompt.encode()).hexdigest()
+        if key in self._query_cache:
+            logger.debug(f"Market research query found in cache: {item.id}")
+            self._query_cache.move_to_end(key)
+            return self._query_cache[key]
+
+        try:
+            query = await self._generate_query(item, user_prompt)
+        except Exception as e:
+            logger.error(f"Failed to generate the market research query: {e}")
+            return item.name
+
+        # don't cache the item name fallback so the query is generated again next time
+        if query != item.name:
+            self._query_cache[key] = query
+            if len(self._query_cache) > self.cache_size:
+                self._query_cache.popitem(last=False)
+        return query
+
+    @retry(retry_policy)
+    async def _generate_query(self, item: Item, user_prompt: str) -> str:
+        """Generate the query for the market research with the LLM.
+
+        Args:
+            item (Item): The item to generate the query for.
+            user_prompt (str): The rendered user prompt for the item.
+
+        Returns:
+            str: The query for the market research. Return the item name if the query is not found.
+        """
+        async with self.client.messages.stream(
+            system=[
+                {
+                    "type": "text",
+                    "text": SYSTEM_PROMPT,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ],
             model=self.model,
-            max_tokens=1024,
+            max_tokens=128,
+            stop_sequences=["\n\n\n"],
             messages=[
                 {
                     "role": "user",
-                    "content": USER_PROMPT.format(
-                        item_name=item.name,
-                        item_description=item.item_detail.description if item.item_detail else "",
-                        item_categories=item.item_detail.categories if item.item_detail else "",
-                    ),
+                    "content": user_prompt,
                 }
             ],
+        ) as stream:
+            response = await stream.get_final_message()
+        logger.debug(
+            f"Prompt cache [{SYSTEM_PROMPT_SHA[:12]}]: read {response.usage.cache_read_input_tokens} tokens, "
+            f"wrote {response.usage.cache_creation_input_tokens} tokens"
         )
 
         try:
@@ -81,7 +183,7 @@ class MarketResearchTool(Tool):
             if text is None:
                 return item.name
 
-            json_data = json_repair.loads(text)
+            json_data = parse_json(text)
             if isinstance(json_data, dict):
                 query = json_data.get("query", item.name)
                 return query
@@ -91,20 +193,39 @@ class MarketResearchTool(Tool):
             logger.error(f"Error evaluating item: {e}")
             return item.name
 
-    async def _get_market_intelligence(self, item: Item) -> MarketIntelligenceResult | None:
+    async def _wait_for_rate_limit(self):
+        """Wait until the next market research request may start.
+
+        Requests are spaced evenly so that no more than `requests_per_minute` start in any minute.
+        """
+        now = time.monotonic()
+        delay = self._next_request_at - now
+        self._next_request_at = max(now, self._next_request_at) + 60 / self.requests_per_minute
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _get_market_intelligence(self, mr: MarketResearch, query: str) -> MarketIntelligenceResult | None:
         try:
-            query = await self._get_query(item)
-            async with MarketResearch() as mr:
-                return await mr.get_market_intelligence(query)
+            # cache hits never reach Mercari, so only the searches count against the rate limit
+            result = await mr.get_cached_market_intelligence(query)
+            if result:
+                return result
+
+            await self._wait_for_rate_limit()
+            # the timer starts with the search, so time spent queued or rate limited doesn't count against it
+            return await asyncio.wait_for(mr.search_market_intelligence(query), timeout=self.per_query_timeout)
+        except TimeoutError:
+            logger.warning(f"Market research timed out: {query}")
+            return None
         except Exception as e:
             logger.error(f"Failed to research the market price: {e}")
             return None
 
     async def _get_market_intelligence_with_semaphore(
-        self, item: Item, semaphore: Semaphore
+        self, mr: MarketResearch, query: str, semaphore: Semaphore
     ) -> MarketIntelligenceResult | None:
         async with semaphore:
-            return await self._get_market_intelligence(item)
+            return await self._get_market_intelligence(mr, query)
 
     async def execute(self, state: State, item_ids: list[str]) -> ToolResult:
         """Execute the tool.
@@ -118,21 +239,43 @@ class MarketResearchTool(Tool):
         """
         logger.info(f"Researching the market price of the items: {item_ids}")
         semaphore = Semaphore(self.concurrent_limit)
-        items = [item for item in state.search_results if item.id in item_ids]
-        tasks = [self._get_market_intelligence_with_semaphore(item, semaphore) for item in items]
-        results = await asyncio.gather(*tasks)
+        items = state.get_search_results(item_ids)
+        queries = await asyncio.gather(*[self._get_query(item) for item in items])
+        logger.opt(lazy=True).debug(
+            "Market research queries taken from item names: {}/{}",
+            lambda: sum(self._is_name_usable_as_query(item) for item in items),
+            lambda: len(items),
+        )
+
+        # items often map to the same query, so research each distinct query once and share the result
+        unique_queries: dict[str, str] = {}
+        for query in queries:
+            unique_queries.setdefault(normalize_query(query), query)
+        # one market research instance shares its cache connection and browser across all queries
+        async with MarketResearch() as mr:
+            tasks = [
+                self._get_market_intelligence_with_semaphore(mr, query, semaphore) for query in unique_queries.values()
+            ]
+            results_by_query = dict(
+                zip(unique_queries, await gather_with_progress("Researched queries", tasks), strict=True)
+            )
+        results = [results_by_query[normalize_query(query)] for query in queries]
 
-        market_research_results = []
         for item, result in zip(items, results, strict=True):
             if result:
                 item.market_research_result = result
-                market_research_results.append(result.get_llm_friendly_result())
                 state.recommended_candidates.append(item)
-            else:
-                market_research_results.append(f"Failed to research the market price of the item: {item.id}")
 
-        debug_msg = "\n\n".join(market_research_results)
-        logger.debug(f"Market research results: {debug_msg}")
+        # the report of every item is only rendered when debug logging is enabled
+        logger.opt(lazy=True).debug(
+            "Market research results: {}",
+            lambda: "\n\n".join(
+                result.get_llm_friendly_result()
+                if result
+                else f"Failed to research the market price of the item: {item.id}"
+                for item, result in zip(items, results, strict=True)
+            ),
+        )
 
         state.remove_duplicate_recommended_candidates()
 
@@ -145,14 +288,9 @@ class MarketResearchTool(Tool):
 
     def _get_simplified_tool_response(self, items: list[Item]) -> str:
         """Get the simplified tool response."""
-        text = ""
-        i = 1
-        for item in items:
-            if item.market_research_result is None:
-                continue
-            text += f"## {i}. [{item.name}]({item.item_url})\n"
-            i += 1
-            text += (
-                f"### Market Research Result: \n\n```\n{item.market_research_result.get_llm_friendly_result()}\n```\n"  # noqa: E501
-            )
-        return text
+        researched = [(item, item.market_research_result) for item in items if item.market_research_result is not None]
+        return "".join(
+            f"## {i}. [{item.name}]({item.item_url})\n"
+            f"### Market Research Result: \n\n```\n{result.get_llm_friendly_result()}\n```\n"
+            for i, (item, result) in enumerate(researched, start=1)
+        )
@@ -3,9 +3,10 @@
 This tool is used to search for items on Mercari.
 """
 
+import asyncio
 from typing import Literal, Type
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 from app.libs.mercari_jp import MercariJPSearch
 from app.types import Item, State, Tool, ToolResult
@@ -15,6 +16,9 @@ from app.utils import get_llm_friendly_items
 class MercariJPSearchToolArgs(BaseModel):
     """Arguments for the mercari_search tool."""
 
+    model_config = ConfigDict(frozen=True)
+    """The model config for the arguments."""
+
     query: str = Field(description="The query to search for, better to be in Japanese")
     min_price: int | None = Field(description="The minimum price to search for in JPY")
     max_price: int | None = Field(description="The maximum price to search for in JPY")
@@ -38,12 +42,18 @@ class MercariJPSearchTool(Tool):
     name: str = "mercari_japan_search"
     """The name of the tool."""
 
-    description: str = "Search for items on Mercari. Each search will add more items to the search results."
+    description: str = (
+        "Search for items on Mercari Japan. Each search will add more items to the search results. "
+        "Use Japanese keywords; price filters must be in JPY."
+    )
     """The description of the tool."""
 
     args_schema: Type[BaseModel] = MercariJPSearchToolArgs
     """The arguments schema for the tool."""
 
+    max_concurrent_pages: int = 5
+    """The maximum number of item detail pages fetched at the same time for the found items."""
+
     async def search_items(  # noqa: PLR0913
         self,
         query: str,
@@ -66,9 +76,34 @@ class MercariJPSearchTool(Tool):
         Returns:
             list[Item]: The list of items found.
         """
-        async with MercariJPSearch() as ms:
+        async with MercariJPSearch(max_concurrent_pages=self.max_concurrent_pages) as ms:
             return await ms.search_items(query, min_price, max_price, max_items, sort_by, order)
 
+    async def search_items_batch(
+        self, queries: list[MercariJPSearchToolArgs], concurrency: int = 8
+    ) -> list[list[Item] | BaseException]:
+        """Run several searches concurrently in a single browser session.
+
+        Args:
+            queries (list[MercariJPSearchToolArgs]): The searches to run.
+            concurrency (int): The maximum number of searches running at the same time. Defaults to 8.
+
+        Returns:
+            list[list[Item] | BaseException]: The items found by each search, in the same order as the queries. A
+                failed search returns its exception instead of failing the others.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async with MercariJPSearch(max_concurrent_pages=self.max_concurrent_pages) as ms:
+
+            async def search(args: MercariJPSearchToolArgs) -> list[Item]:
+                async with semaphore:
+                    return await ms.search_items(
+                        args.query, args.min_price, args.max_price, args.max_items, args.sort_by, args.order or "desc"
+                    )
+
+            return await asyncio.gather(*[search(args) for args in queries], return_exceptions=True)
+
     async def execute(  # noqa: PLR0913
         self,
         state: State,
@@ -95,8 +130,7 @@ class MercariJPSearchTool(Tool):
         """
         try:
             search_results = await self.search_items(query, min_price, max_price, max_items, sort_by, order)
-            state.search_results.extend(search_results)
-            state.remove_duplicate_search_results()
+            state.add_search_results(search_results)
             return ToolResult(
                 is_error=False,
                 tool_response=get_llm_friendly_items(search_results),
@@ -113,7 +147,9 @@ class MercariJPSearchTool(Tool):
 
     def _get_simplified_tool_response(self, items: list[Item]) -> str:
         """Get the simplified tool response."""
-        text = "Search results:\n"
-        for i, item in enumerate(items, start=1):
-            text += f"{i}. [{item.name} ({item.currency} {item.price})]({item.item_url})\n"
-        return text
+        lines = ["Search results:"]
+        lines.extend(
+            f"{i}. [{item.name} ({item.currency} {item.price})]({item.item_url})"
+            for i, item in enumerate(items, start=1)
+        )
+        return "\n".join(lines) + "\n"
@@ -5,7 +5,7 @@ This tool is used to search for items on Mercari.
 
 from typing import Type
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 from app.exception import SearchNotFoundError
 from app.libs.mercari import MercariSearch
@@ -16,6 +16,9 @@ from app.utils import get_llm_friendly_items
 class MercariSearchToolArgs(BaseModel):
     """Arguments for the mercari_search tool."""
 
+    model_config = ConfigDict(frozen=True)
+    """The model config for the arguments."""
+
     query: str = Field(description="The query to search for")
     min_price: int | None = Field(description="The minimum price to search for in USD")
     max_price: int | None = Field(description="The maximum price to search for in USD")
@@ -61,8 +64,7 @@ class MercariSearchTool(Tool):
         """
         try:
             search_results = await self.search_items(query, min_price, max_price)
-            state.search_results.extend(search_results)
-            state.remove_duplicate_search_results()
+            state.add_search_results(search_results)
             return ToolResult(
                 is_error=False,
                 tool_response=get_llm_friendly_items(search_results),
@@ -86,7 +88,9 @@ class MercariSearchTool(Tool):
 
     def _get_simplified_tool_response(self, items: list[Item]) -> str:
         """Get the simplified tool response."""
-        text = "Search results:\n"
-        for i, item in enumerate(items, start=1):
-            text += f"{i}. [{item.name} ({item.currency} {item.price})]({item.item_url})\n"
-        return text
+        lines = ["Search results:"]
+        lines.extend(
+            f"{i}. [{item.name} ({item.currency} {item.price})]({item.item_url})"
+            for i, item in enumerate(items, start=1)
+        )
+        return "\n".join(lines) + "\n"
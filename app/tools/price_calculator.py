@@ -5,15 +5,18 @@ This tool is used to select the best item from the search results.
 
 from typing import Type
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 from app.types import State, Tool, ToolResult
-from app.utils import jpy_to_usd, usd_to_jpy
+from app.utils import get_exchange_rate
 
 
 class PriceCalculatorToolArgs(BaseModel):
     """Arguments for the price_calculator tool."""
 
+    model_config = ConfigDict(frozen=True)
+    """The model config for the arguments."""
+
     source_currency: str = Field(description="The currency of the source price. Only USD and JPY are supported.")
     """The currency of the source price. Only USD and JPY are supported."""
 
@@ -30,19 +33,17 @@ class PriceCalculatorTool(Tool):
     name: str = "price_calculator"
     """The name of the tool."""
 
-    description: str = "Convert the price from the source currency to the target currency."
+    description: str = (
+        "Convert the price from the source currency to the target currency (JPY and USD). "
+        "Essential for applying price filters."
+    )
     """The description of the tool."""
 
     args_schema: Type[BaseModel] = PriceCalculatorToolArgs
 
     def _convert_price(self, source_currency: str, target_currency: str, source_price: float) -> float:
         """Convert the price from the source currency to the target currency."""
-        if source_currency == "JPY" and target_currency == "USD":
-            return jpy_to_usd(source_price)
-        elif source_currency == "USD" and target_currency == "JPY":
-            return usd_to_jpy(source_price)
-        else:
-            raise ValueError(f"Unsupported currency conversion: {source_currency} to {target_currency}")
+        return source_price * get_exchange_rate(source_currency, target_currency)
 
     async def execute(
         self, state: State, source_currency: str, target_currency: str, source_price: float
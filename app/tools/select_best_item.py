@@ -5,20 +5,26 @@ This tool is used to select the best item from the search results.
 
 from typing import Type
 
-import json_repair
 from aioretry.retry import retry
 from anthropic import AsyncAnthropic
+from anthropic.types import Message
 from loguru import logger
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 
-from app.prompts.select_best_item import SYSTEM_PROMPT, USER_PROMPT
+from app.prompts.select_best_item import SYSTEM_PROMPT, SYSTEM_PROMPT_SHA, USER_PROMPT
 from app.types import Item, ItemRecommendation, State, Tool, ToolResult
-from app.utils import get_llm_friendly_items, retry_policy
+from app.utils import get_llm_friendly_items, parse_json, retry_policy
+
+# validates all recommendations of a reply in one call
+RECOMMENDATIONS_ADAPTER = TypeAdapter(list[ItemRecommendation])
 
 
 class SelectBestItemToolArgs(BaseModel):
     """Arguments for the select_best_item tool."""
 
+    model_config = ConfigDict(frozen=True)
+    """The model config for the arguments."""
+
 
 class SelectBestItemTool(Tool):
     """Select Best Item Tool."""
@@ -26,7 +32,11 @@ class SelectBestItemTool(Tool):
     name: str = "select_best_item"
     """The name of the tool."""
 
-    description: str = "Select the best item based on item that has been evaluated and has a relevance score greater than or equal to the minimum relevance score."  # noqa: E501
+    description: str = (
+        "Select the top 3 items from all evaluated items with a relevance score greater than or equal to the "
+        "minimum relevance score, with detailed reasoning for each. This tool takes no arguments - it "
+        "automatically uses all qualifying evaluated items."
+    )
     """The description of the tool."""
 
     min_relevance_score: float = 0.8
@@ -41,23 +51,60 @@ class SelectBestItemTool(Tool):
     model: str = "claude-3-5-sonnet-latest"
     """The model to use for the tool."""
 
+    max_tokens: int = 2048
+    """The maximum number of tokens of the recommendations."""
+
     args_schema: Type[BaseModel] = SelectBestItemToolArgs
 
     @retry(retry_policy)
-    async def _select_best_item(self, items: list[Item], user_query: str) -> list[ItemRecommendation]:
-        """Select the best item from the search results."""
-        response = await self.client.messages.create(
+    async def _select_best_item(self, items: list[Item], user_prompt: str) -> list[ItemRecommendation]:
+        """Select the best item from the search results.
+
+        Args:
+            items (list[Item]): The candidate items.
+            user_prompt (str): The rendered user prompt with the candidate items.
+
+        Returns:
+            list[ItemRecommendation]: The recommended items.
+        """
+        async with self.client.messages.stream(
             model=self.model,
-            max_tokens=2048,
+            max_tokens=self.max_tokens,
             temperature=self.temperature,
-            system=SYSTEM_PROMPT,
+            system=[
+                {
+                    "type": "text",
+                    "text": SYSTEM_PROMPT,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ],
             messages=[
                 {
                     "role": "user",
-                    "content": USER_PROMPT.format(candidate_items=get_llm_friendly_items(items), user_query=user_query),
+                    "content": user_prompt,
                 },
             ],
+        ) as stream:
+            response = await stream.get_final_message()
+        logger.debug(
+            f"Prompt cache [{SYSTEM_PROMPT_SHA[:12]}]: read {response.usage.cache_read_input_tokens} tokens, "
+            f"wrote {response.usage.cache_creation_input_tokens} tokens"
         )
+        return self._parse_recommendations(response, items)
+
+    def _parse_recommendations(self, response: Message, items: list[Item]) -> list[ItemRecommendation]:
+        """Parse the recommendations from the LLM response.
+
+        Args:
+            response (Message): The LLM response.
+            items (list[Item]): The candidate items.
+
+        Returns:
+            list[ItemRecommendation]: The recommended items.
+        """
+        if response.stop_reason == "max_tokens":
+            logger.warning(f"Recommendations truncated at {self.max_tokens} tokens")
+
         try:
             text = None
             for content in response.content:
@@ -68,22 +115,27 @@ class SelectBestItemTool(Tool):
             if text is None:
                 return []
 
-            parsed_item_recommendations = json_repair.loads(text)
+            parsed_item_recommendations = parse_json(text)
             if not isinstance(parsed_item_recommendations, list):
                 return []
 
-            recommendations: list[ItemRecommendation] = []
+            items_by_id = {item.id: item for item in items}
+            prepared_items: list[dict] = []
             for parsed_item in parsed_item_recommendations:
                 if not isinstance(parsed_item, dict):
                     continue
 
                 item_id = parsed_item.get("item_id", "")
-                item = [item for item in items if item.id == item_id][0]
+                item = items_by_id.get(item_id)
+                if item is None:
+                    logger.warning(f"Selected item not found in the candidates: {item_id}")
+                    continue
+
                 del parsed_item["item_id"]
                 parsed_item["item"] = item
-                recommendations.append(ItemRecommendation.model_validate(parsed_item, strict=False))
+                prepared_items.append(parsed_item)
 
-            return recommendations
+            return RECOMMENDATIONS_ADAPTER.validate_python(prepared_items, strict=False)
         except Exception as e:
             logger.error(f"Error evaluating item: {e}")
             return []
@@ -103,22 +155,27 @@ class SelectBestItemTool(Tool):
             for item in state.recommended_candidates
             if item.relevance_score and item.relevance_score.score >= self.min_relevance_score
         ]
-        recommendations = await self._select_best_item(candidates, state.user_query)
+        # render the prompt outside the retried call so a retry doesn't serialize the candidates again
+        user_prompt = USER_PROMPT.substitute(
+            candidate_items=get_llm_friendly_items(candidates), user_query=state.user_query
+        )
+        recommendations = await self._select_best_item(candidates, user_prompt)
         state.recommended_items.extend(recommendations)
 
-        is_error = recommendations == []
-        error_msg = "No recommendations found" if is_error else ""
+        is_error = not recommendations
+        tool_response = "No recommendations found" if is_error else "Successfully added items to recommendation items"
 
         return ToolResult(
-            is_error=recommendations == [],
-            tool_response="Successfully added items to recommendation items" if not is_error else error_msg,
+            is_error=is_error,
+            tool_response=tool_response,
             updated_state=state,
             simplified_tool_response=self._get_simplified_tool_response(recommendations),
         )
 
     def _get_simplified_tool_response(self, items: list[ItemRecommendation]) -> str:
         """Get the simplified tool response."""
-        text = "Selected items:\n"
-        for i, item in enumerate(items, start=1):
-            text += f"{i}. [{item.item.name} ({item.item.currency} {item.item.price})]({item.item.item_url})\n"
-        return text
+        lines = ["Selected items:"]
+        for i, recommendation in enumerate(items, start=1):
+            item = recommendation.item
+            lines.append(f"{i}. [{item.name} ({item.currency} {item.price})]({item.item_url})")
+        return "\n".join(lines) + "\n"
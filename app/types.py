@@ -3,16 +3,22 @@
 This module contains the types for the Mercari Shopping Agent.
 """
 
-import json
-from typing import Any, Literal, Type
+import functools
+from typing import TYPE_CHECKING, Any, Literal, Type
 
-from anthropic.types import ToolParam
-from pydantic import BaseModel, ConfigDict, Field
+import orjson
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+if TYPE_CHECKING:
+    from anthropic.types import ToolParam
 
 
 class ItemRelevanceScore(BaseModel):
     """A structured representation of a relevance score for an item."""
 
+    model_config = ConfigDict(frozen=True)
+    """The model config for the item relevance score."""
+
     score: float = Field(default=0.0, description="The relevance score of the item.")
     """The relevance score of the item."""
 
@@ -39,6 +45,21 @@ class ToolResult(BaseModel):
     """The updated state of the tool call."""
 
 
+@functools.cache
+def _get_json_schema(model: Type[BaseModel]) -> dict[str, Any]:
+    """Get the JSON schema of a model.
+
+    Building the schema is a pure function of the model class, so it is only done once per class.
+
+    Args:
+        model (Type[BaseModel]): The model to get the JSON schema for.
+
+    Returns:
+        dict[str, Any]: The JSON schema of the model.
+    """
+    return model.model_json_schema()
+
+
 class Tool(BaseModel):
     """Base class for a tool that can be called by a language model.
 
@@ -65,17 +86,17 @@ class Tool(BaseModel):
     """The Pydantic model for the tool's arguments."""
 
     @property
-    def tool_param(self) -> ToolParam:
+    def tool_param(self) -> "ToolParam":
         """The tool parameter for the tool.
 
         Returns:
             ToolParam: The tool parameter for the tool.
         """
-        return ToolParam(
-            name=self.name,
-            description=self.description,
-            input_schema=self.args_schema.model_json_schema(),
-        )
+        return {
+            "name": self.name,
+            "description": self.description,
+            "input_schema": _get_json_schema(self.args_schema),
+        }
 
     async def execute(self, state: "State", **kwargs: Any) -> ToolResult:
         """Executes the tool with the given arguments.
@@ -98,6 +119,9 @@ class Tool(BaseModel):
 class ItemDetail(BaseModel):
     """A structured representation of a product listing from Mercari."""
 
+    model_config = ConfigDict(frozen=True)
+    """The model config for the item detail."""
+
     converted_price: str | None = None
     """The converted price of the item."""
 
@@ -141,6 +165,9 @@ class ItemDetail(BaseModel):
 class MarketResearchResult(BaseModel):
     """A structured representation of the market research result."""
 
+    model_config = ConfigDict(frozen=True)
+    """The model config for the market research result."""
+
     average_price: float
     """The average price of the item."""
 
@@ -157,6 +184,9 @@ class MarketResearchResult(BaseModel):
 class PriceRange(BaseModel):
     """A structured representation of the price range."""
 
+    model_config = ConfigDict(frozen=True)
+    """The model config for the price range."""
+
     min: float
     """The minimum price of the price range."""
 
@@ -194,6 +224,9 @@ class PriceRange(BaseModel):
 class PriceGuidance(BaseModel):
     """A structured representation of the price guidance."""
 
+    model_config = ConfigDict(frozen=True)
+    """The model config for the price guidance."""
+
     budget_shopping: str
     """The budget shopping guidance."""
 
@@ -232,6 +265,9 @@ class ShoppingRecommendation(BaseModel):
 class MarketIntelligenceResult(BaseModel):
     """A structured representation of the market intelligence."""
 
+    model_config = ConfigDict(frozen=True)
+    """The model config for the market intelligence result."""
+
     typical_price_range: PriceRange
     """The typical price range."""
 
@@ -261,6 +297,9 @@ class MarketIntelligenceResult(BaseModel):
 class BasicProductData(BaseModel):
     """A structured representation of the basic product data."""
 
+    model_config = ConfigDict(frozen=True)
+    """The model config for the basic product data."""
+
     price: float
     """The price of the product."""
 
@@ -304,10 +343,42 @@ class Item(BaseModel):
     market_research_result: MarketIntelligenceResult | None = None
     """The market research result of the item."""
 
+    def get_condition(self) -> str | None:
+        """Get the condition of the item, preferring the condition from the item detail page.
+
+        Returns:
+            str | None: The condition of the item. None if the condition is unknown.
+        """
+        condition_type = self.item_detail.condition_type if self.item_detail else None
+        return condition_type or self.condition_grade
+
+    def get_price(self) -> tuple[str, str | None]:
+        """Get the listed price of the item and its converted price.
+
+        Returns:
+            tuple[str, str | None]: The listed price with its currency, and the converted price if the item detail
+                has one.
+        """
+        converted_price = self.item_detail.converted_price if self.item_detail else None
+        return f"{self.currency} {self.price}", converted_price or None
+
+    def __eq__(self, other: object) -> bool:
+        """Compare items by ID, since the same listing may carry different evaluation results."""
+        if not isinstance(other, Item):
+            return NotImplemented
+        return self.id == other.id
+
+    def __hash__(self) -> int:
+        """Hash the item by ID, so items can be deduplicated with sets and dicts."""
+        return hash(self.id)
+
 
 class TrustSignal(BaseModel):
     """A trust signal for an item."""
 
+    model_config = ConfigDict(frozen=True)
+    """The model config for the trust signal."""
+
     seller_rating: str
     """The seller rating of the trust signal."""
 
@@ -318,6 +389,9 @@ class TrustSignal(BaseModel):
 class ItemRecommendation(BaseModel):
     """A recommendation for an item."""
 
+    model_config = ConfigDict(frozen=True)
+    """The model config for the item recommendation."""
+
     item: Item
     """The item to recommend."""
 
@@ -358,13 +432,41 @@ class State(BaseModel):
     recommended_candidates: list[Item] = Field(default_factory=list)
     """The recommended candidates."""
 
-    def remove_duplicate_search_results(self):
-        """Remove duplicate search results."""
-        # avoid circular import
-        from app.utils import remove_duplicate_items  # noqa: PLC0415
+    _search_index: dict[str, Item] = PrivateAttr(default_factory=dict)
+    """The search results, keyed by item ID."""
+
+    def model_post_init(self, __context: Any):
+        """Index the initial search results, keeping the first occurrence of each item."""
+        for item in self.search_results:
+            self._search_index.setdefault(item.id, item)
+        self.search_results = list(self._search_index.values())
+
+    def add_search_results(self, items: list[Item]):
+        """Add search results, skipping items that are already in the search results.
 
-        unique_items = remove_duplicate_items(self.search_results)
-        self.search_results = unique_items
+        The search results are indexed by item ID, so duplicates are skipped on insertion and never have to be
+        removed afterwards.
+
+        Args:
+            items (list[Item]): The items to add.
+        """
+        for item in items:
+            if item.id not in self._search_index:
+                self._search_index[item.id] = item
+                self.search_results.append(item)
+
+    def get_search_results(self, item_ids: list[str]) -> list[Item]:
+        """Get the search results with the given IDs.
+
+        Unknown IDs are skipped, and each item is returned once, in the order of its first ID.
+
+        Args:
+            item_ids (list[str]): The IDs of the items.
+
+        Returns:
+            list[Item]: The matching search results.
+        """
+        return [self._search_index[item_id] for item_id in dict.fromkeys(item_ids) if item_id in self._search_index]
 
     def remove_duplicate_recommended_candidates(self):
         """Remove duplicate recommended candidates."""
@@ -383,13 +485,13 @@ class State(BaseModel):
         # avoid circular import
         from app.utils import get_llm_friendly_items  # noqa: PLC0415
 
-        return json.dumps(
+        return orjson.dumps(
             {
                 "user_query": self.user_query,
                 "search_results": get_llm_friendly_items(self.search_results),
             },
-            indent=2,
-        )
+            option=orjson.OPT_INDENT_2,
+        ).decode()
 
 
 class AgentAction(BaseModel):
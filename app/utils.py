@@ -3,9 +3,13 @@
 This module contains the utils for the Mercari Shopping Agent.
 """
 
-import json
+import asyncio
 import random
+import re
+from typing import Any, Coroutine, Literal, TypeVar
 
+import json_repair
+import orjson
 from aioretry.retry import RetryInfo, RetryPolicyStrategy
 from anthropic import InternalServerError
 from loguru import logger
@@ -17,6 +21,88 @@ INITIAL_RETRY_DELAY = 3
 MAX_RETRIES = 5
 MAX_BACKOFF = 60
 JITTER_FACTOR = 0.1
+# the backoff reaches MAX_BACKOFF long before this exponent, so larger ones are not computed
+MAX_BACKOFF_EXPONENT = 20
+
+# the retry jitter needs no shared state with the rest of the program, so it has its own generator
+_retry_rng = random.Random()
+
+HIGH_CREDIBILITY_MIN_STARS = 4.5
+HIGH_CREDIBILITY_MIN_REVIEWS = 50
+LOW_CREDIBILITY_MAX_STARS = 4.0
+LOW_CREDIBILITY_MAX_REVIEWS = 10
+
+FAIR_PRICE_TOLERANCE = 0.1
+
+# fixed rates as of 2025/07/12, keyed by (source currency, target currency)
+EXCHANGE_RATES = {
+    ("JPY", "USD"): 0.0068,
+    ("USD", "JPY"): 147.42,
+}
+
+T = TypeVar("T")
+
+SellerCredibility = Literal["VERY_HIGH", "HIGH", "MODERATE", "LOW"]
+MarketPosition = Literal["EXCELLENT_DEAL", "GOOD_DEAL", "FAIR", "OVERPRICED"]
+
+JSON_FENCE_PATTERN = re.compile(r"\A\s*```(?:json)?\s*|\s*```\s*\Z")
+
+
+def dumps_compact(data: Any) -> str:
+    """Serialize the data to minified JSON with sorted keys.
+
+    Used for JSON that is embedded in prompts: no indentation whitespace is sent to the LLM, and the same
+    data always produces the same bytes.
+
+    Args:
+        data (Any): The data to serialize.
+
+    Returns:
+        str: The minified JSON string.
+    """
+    return orjson.dumps(data, option=orjson.OPT_SORT_KEYS).decode()
+
+
+def parse_json(text: str) -> Any:
+    """Parse JSON returned by the LLM.
+
+    The LLM usually returns clean JSON, so a strict parse is tried first and `json_repair` is only used when it
+    fails. A surrounding markdown code fence is stripped before parsing.
+
+    Args:
+        text (str): The text to parse.
+
+    Returns:
+        Any: The parsed JSON data.
+    """
+    text = JSON_FENCE_PATTERN.sub("", text)
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return json_repair.loads(text)
+
+
+async def gather_with_progress(label: str, coroutines: list[Coroutine[Any, Any, T]]) -> list[T]:
+    """Run coroutines concurrently, logging the progress as each one completes.
+
+    Args:
+        label (str): The label of the progress log.
+        coroutines (list[Coroutine[Any, Any, T]]): The coroutines to run.
+
+    Returns:
+        list[T]: The results, in the same order as the coroutines.
+    """
+    total = len(coroutines)
+    done = 0
+
+    async def track(coroutine: Coroutine[Any, Any, T]) -> T:
+        nonlocal done
+        result = await coroutine
+        done += 1
+        logger.debug(f"{label}: {done}/{total}")
+        return result
+
+    return await asyncio.gather(*[track(coroutine) for coroutine in coroutines])
 
 
 def remove_duplicate_items(items: list[Item]) -> list[Item]:
@@ -28,19 +114,14 @@ def remove_duplicate_items(items: list[Item]) -> list[Item]:
     Returns:
         list[Item]: The list of items with duplicates removed.
     """
-    items_ids = set()
-    new_items: list[Item] = []
-    for item in items:
-        if item.id not in items_ids:
-            items_ids.add(item.id)
-            new_items.append(item)
-    return new_items
+    # items are hashed by ID, so the first occurrence of each item is kept in order
+    return list(dict.fromkeys(items))
 
 
 def retry_policy(info: RetryInfo) -> RetryPolicyStrategy:
     """Retry policy for the search_items function.
 
-    If the exception is a SearchNotFoundError, retry max 3 times.
+    If the exception is a SearchNotFoundError or an InternalServerError, retry up to `MAX_RETRIES` times.
     Otherwise, retry once.
 
     Args:
@@ -51,17 +132,71 @@ def retry_policy(info: RetryInfo) -> RetryPolicyStrategy:
     """
     logger.info(f"Retry attempt {info.fails} of {MAX_RETRIES}")
     logger.error(f"Error: {info.exception}")
-    should_stop = True
-    if isinstance(info.exception, (SearchNotFoundError, InternalServerError)) or info.fails <= MAX_RETRIES:
-        should_stop = False
+    max_retries = MAX_RETRIES if isinstance(info.exception, (SearchNotFoundError, InternalServerError)) else 1
+    should_stop = info.fails > max_retries
 
-    delay = min(INITIAL_RETRY_DELAY * (2 ** (info.fails - 1)), MAX_BACKOFF)
-    jitter = random.uniform(-JITTER_FACTOR * delay, JITTER_FACTOR * delay)
+    delay = min(INITIAL_RETRY_DELAY * (1 << min(info.fails - 1, MAX_BACKOFF_EXPONENT)), MAX_BACKOFF)
+    jitter = (_retry_rng.random() * 2.0 - 1.0) * JITTER_FACTOR * delay
     delay = max(0, int(delay + jitter))
 
     return should_stop, delay
 
 
+def classify_seller_credibility(stars: float, reviews: int, verification_status: str | None) -> SellerCredibility:
+    """Classify the seller credibility.
+
+    Official shops (メルカリShops) are always very high credibility. Verified sellers (本人確認済) with a
+    high rating and many reviews are high credibility. Unverified sellers (本人確認前) with few reviews or a
+    low rating are low credibility. Everyone else is moderate credibility.
+
+    Args:
+        stars (float): The average rating of the seller.
+        reviews (int): The number of reviews the seller has.
+        verification_status (str | None): The verification status of the seller.
+
+    Returns:
+        SellerCredibility: The seller credibility tier.
+    """
+    verification_status = verification_status or ""
+    if "メルカリShops" in verification_status:
+        return "VERY_HIGH"
+
+    if "本人確認済" in verification_status:
+        if stars > HIGH_CREDIBILITY_MIN_STARS and reviews > HIGH_CREDIBILITY_MIN_REVIEWS:
+            return "HIGH"
+        return "MODERATE"
+
+    if reviews < LOW_CREDIBILITY_MAX_REVIEWS or stars < LOW_CREDIBILITY_MAX_STARS:
+        return "LOW"
+    return "MODERATE"
+
+
+def classify_market_position(item: Item) -> MarketPosition | None:
+    """Classify the item price against its market research benchmarks.
+
+    The market research benchmarks are in USD, so JPY prices are converted first.
+
+    Args:
+        item (Item): The item to classify.
+
+    Returns:
+        MarketPosition | None: The market position. None if the item has no market research result.
+    """
+    if not item.market_research_result:
+        return None
+
+    price_range = item.market_research_result.typical_price_range
+    price = jpy_to_usd(item.price) if item.currency in ("¥", "JPY") else item.price
+
+    if price <= price_range.good_deal_max:
+        return "EXCELLENT_DEAL"
+    if price >= price_range.overpriced_min:
+        return "OVERPRICED"
+    if price < price_range.median * (1 - FAIR_PRICE_TOLERANCE):
+        return "GOOD_DEAL"
+    return "FAIR"
+
+
 def get_llm_friendly_items(items: list[Item], include_market_research: bool = False) -> str:
     """Convert the items to a format that is friendly to the LLM.
 
@@ -72,10 +207,10 @@ def get_llm_friendly_items(items: list[Item], include_market_research: bool = Fa
     Returns:
         str: The items in a format that is friendly to the LLM.
     """
-    data = []
-    for item in items:
-        data.append(get_llm_friendly_item(item, return_dict=True, include_market_research=include_market_research))
-    return json.dumps(data, indent=2, ensure_ascii=False)
+    data = [
+        get_llm_friendly_item(item, return_dict=True, include_market_research=include_market_research) for item in items
+    ]
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
 
 
 def get_llm_friendly_item(
@@ -95,53 +230,82 @@ def get_llm_friendly_item(
         str | dict: The LLM friendly item.
     """
     item_detail = item.item_detail
-    if item_detail and item_detail.condition_type:
-        condition = item_detail.condition_type
-    else:
-        condition = item.condition_grade
-
-    price = f"{item.currency} {item.price}"
-    if item_detail and item_detail.converted_price:
-        price = [price, item_detail.converted_price]
+    relevance_score = item.relevance_score
+    listed_price, converted_price = item.get_price()
+    price = [listed_price, converted_price] if converted_price else listed_price
+    description = ""
+    num_likes = seller_stars = seller_reviews = seller_credibility = delivery_from = None
+    categories = []
+    # check for the item detail once and bind its fields, instead of testing it for every field
+    if item_detail:
+        description = item_detail.description
+        num_likes = item_detail.num_likes
+        seller_stars = item_detail.seller_review_stars
+        seller_reviews = item_detail.seller_review
+        seller_credibility = classify_seller_credibility(
+            seller_stars, seller_reviews, item_detail.seller_verification_status
+        )
+        delivery_from = item_detail.delivery_from
+        categories = item_detail.categories
 
     data = {
         "id": item.id,
         "name": item.name,
         "price": price,
-        "description": item_detail.description if item_detail else "",
-        "condition": condition,
+        "description": description,
+        "condition": item.get_condition(),
         "brand": item.brand,
-        "num_likes": item_detail.num_likes if item_detail else None,
-        "seller_stars": item_detail.seller_review_stars if item_detail else None,
-        "seller_total_person_reviews": item_detail.seller_review if item_detail else None,
-        "delivery_from": item_detail.delivery_from if item_detail else None,
-        "categories": item_detail.categories if item_detail else [],
-        "relevance_score": item.relevance_score.score if item.relevance_score else None,
-        "relevance_score_reasoning": item.relevance_score.reasoning if item.relevance_score else None,
+        "num_likes": num_likes,
+        "seller_stars": seller_stars,
+        "seller_total_person_reviews": seller_reviews,
+        "seller_credibility": seller_credibility,
+        "delivery_from": delivery_from,
+        "categories": categories,
+        "market_position": classify_market_position(item),
+        "relevance_score": relevance_score.score if relevance_score else None,
+        "relevance_score_reasoning": relevance_score.reasoning if relevance_score else None,
     }
 
-    if item_detail and item_detail.seller_verification_status:
-        data["seller_verification_status "] = item_detail.seller_verification_status
-
-    if item_detail and item_detail.shipping_fee:
-        data["shipping_fee"] = item_detail.shipping_fee
-
-    if item_detail and item_detail.posted_date:
-        data["posted_date"] = item_detail.posted_date
+    if item_detail:
+        optional_fields = {
+            "seller_verification_status": item_detail.seller_verification_status,
+            "shipping_fee": item_detail.shipping_fee,
+            "posted_date": item_detail.posted_date,
+        }
+        data |= {key: value for key, value in optional_fields.items() if value}
 
     if include_market_research and item.market_research_result:
         data["market_research"] = item.market_research_result.get_llm_friendly_result()
 
     if return_dict:
         return data
-    return json.dumps(data, indent=2, ensure_ascii=False)
+    return dumps_compact(data)
+
+
+def get_exchange_rate(source_currency: str, target_currency: str) -> float:
+    """Get the exchange rate from the source currency to the target currency.
+
+    Args:
+        source_currency (str): The currency to convert from.
+        target_currency (str): The currency to convert to.
+
+    Returns:
+        float: The exchange rate.
+
+    Raises:
+        ValueError: If the currency conversion is not supported.
+    """
+    rate = EXCHANGE_RATES.get((source_currency, target_currency))
+    if rate is None:
+        raise ValueError(f"Unsupported currency conversion: {source_currency} to {target_currency}")
+    return rate
 
 
 def jpy_to_usd(jpy_price: float) -> float:
     """Convert JPY to USD."""
-    return jpy_price * 0.0068  # 2025/07/12
+    return jpy_price * EXCHANGE_RATES[("JPY", "USD")]
 
 
 def usd_to_jpy(usd_price: float) -> float:
     """Convert USD to JPY."""
-    return usd_price * 147.42  # 2025/07/12
+    return usd_price * EXCHANGE_RATES[("USD", "JPY")]
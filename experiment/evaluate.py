@@ -7,23 +7,25 @@ pip install agentevals
 ```
 """
 
-import json
 import os
 from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
 
+import orjson
 from agentevals.trajectory.llm import TRAJECTORY_ACCURACY_PROMPT, create_trajectory_llm_as_judge  # type: ignore
 
 if __name__ == "__main__":
     parser = ArgumentParser()
     parser.add_argument("--trajectory-path", type=str, required=True)
     parser.add_argument("--output", type=str, required=True)
+    parser.add_argument("--concurrency", type=int, default=8, help="The maximum number of concurrent judge calls.")
 
     args = parser.parse_args()
 
     dataset = []
-    for file in os.listdir(args.trajectory_path):
-        with open(os.path.join(args.trajectory_path, file), "r") as f:
-            parsed_trajectory = json.load(f)
+    for entry in os.scandir(args.trajectory_path):
+        with open(entry.path, "rb") as f:
+            parsed_trajectory = orjson.loads(f.read())
         agentevals_trajectories = []
         for trajectory in parsed_trajectory:
             if isinstance(trajectory["content"], str):
@@ -36,20 +38,26 @@ if __name__ == "__main__":
 
             elif isinstance(trajectory["content"], list):
                 tool_calls = []
-                tool_results = ""
+                tool_result_parts: list[str] = []
                 for content in trajectory["content"]:
                     if content["type"] == "tool_use":
                         tool_calls.append(
-                            {"function": {"name": content["name"], "arguments": json.dumps(content["input"])}}
+                            {
+                                "function": {
+                                    "name": content["name"],
+                                    "arguments": orjson.dumps(content["input"]).decode(),
+                                }
+                            }
                         )
                     elif content["type"] == "tool_result":
-                        tool_results += content["content"]
+                        tool_result_parts.append(content["content"])
 
                 if tool_calls:
                     agentevals_trajectories.append(
                         {"role": trajectory["role"], "content": "", "tool_calls": tool_calls}
                     )
 
+                tool_results = "".join(tool_result_parts)
                 if tool_results:
                     agentevals_trajectories.append({"role": "tool", "content": tool_results})
 
@@ -61,16 +69,12 @@ if __name__ == "__main__":
         model="openai:o3-mini",
     )
 
-    results = []
-    scores = []
-    for data in dataset:
-        eval_result = trajectory_evaluator(
-            outputs=data,
-        )
-        scores.append(int(eval_result["score"]))
-        results.append(eval_result)
+    # the judge calls are independent and network bound, so run them concurrently; map keeps the dataset order
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda data: trajectory_evaluator(outputs=data), dataset))
+    scores = [int(eval_result["score"]) for eval_result in results]
 
     print("Score:", sum(scores) / len(scores))
 
-    with open(args.output, "w") as f:
-        f.write(json.dumps(results, indent=2, ensure_ascii=False))
+    with open(args.output, "wb") as f:
+        f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
@@ -0,0 +1,40 @@
+import pytest
+
+from app.prompts.agent_jp import SYSTEM_PROMPT_SHAS, is_specific_query
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "something for a special occasion",
+        "a cute pineapple plush",
+        "a canonical guide to cooking",
+        "winter clothes under $500",
+        "good smartphone under 3万円",
+    ],
+)
+def test_vague_query_is_not_specific(query):
+    assert not is_specific_query(query)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "iPhone 14 Pro Max 128GB under $1000",
+        "Casio watch",
+        "apple airpods",
+        "Canon camera",
+        "NVIDIA RTX graphics card",
+        "任天堂スイッチ",
+    ],
+)
+def test_specific_query_is_specific(query):
+    assert is_specific_query(query)
+
+
+def test_system_prompts_are_unchanged():
+    # an edit to either system prompt invalidates its prompt cache, so it has to update these digests on purpose
+    assert SYSTEM_PROMPT_SHAS == {
+        True: "0c753a67e25fb4b7f05f5d33201c4aeb0fdade69ca01f862bef28908ef03f47f",
+        False: "61aa31cc7eb1e09ba66fadb4af45ca812e04ac345d977993b27e95c39b58271c",
+    }
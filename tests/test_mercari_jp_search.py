@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+# the tool pulls in pydantic, playwright and the cache backends, which are only there in the full environment
+mercari_jp_search = pytest.importorskip("app.tools.mercari_jp_search")
+
+
+class FakeMercariJPSearch:
+    def __init__(self, max_concurrent_pages: int):
+        self.max_concurrent_pages = max_concurrent_pages
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    async def search_items(self, query, min_price, max_price, max_items, sort_by, order):
+        # the first query finishes last, so the results only keep their order if the batch restores it
+        await asyncio.sleep(0.01 if query == "first" else 0)
+        if query == "broken":
+            raise RuntimeError(query)
+        return [f"{query}-item"]
+
+
+def make_args(query: str) -> "mercari_jp_search.MercariJPSearchToolArgs":
+    return mercari_jp_search.MercariJPSearchToolArgs(query=query, min_price=None, max_price=None)
+
+
+def test_search_items_batch_keeps_order_and_isolates_failures(monkeypatch):
+    monkeypatch.setattr(mercari_jp_search, "MercariJPSearch", FakeMercariJPSearch)
+    queries = [make_args("first"), make_args("broken"), make_args("last")]
+
+    results = asyncio.run(mercari_jp_search.MercariJPSearchTool().search_items_batch(queries, concurrency=2))
+
+    assert results[0] == ["first-item"]
+    assert isinstance(results[1], RuntimeError)
+    assert str(results[1]) == "broken"
+    assert results[2] == ["last-item"]
@@ -1,19 +1,153 @@
 """Web app for the Mercari shopping agent."""
 
 import asyncio
+import functools
 import os
+import re
+from typing import TYPE_CHECKING
 
-import gradio as gr
-from anthropic import AsyncAnthropic
 from dotenv import load_dotenv
 
-from app.agent import MercariShoppingAgent
 from app.types import ItemRecommendation
 
+if TYPE_CHECKING:
+    from app.agent import MercariShoppingAgent
+
 load_dotenv()
 
-client = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-agent = MercariShoppingAgent(client=client, model=os.getenv("MODEL_NAME", "claude-3-5-sonnet-latest"))
+# a run of backticks inside a fenced block would close the fence early
+CODE_FENCE_PATTERN = re.compile(r"`{3,}")
+
+RECOMMENDATIONS_HEADER = "## 🎯 Top Picks for You\n"
+
+CARD_TEMPLATE = (
+    "### {index}. [{title}]({item_url})\n"
+    "*{persona_fit}*\n\n"
+    "![{name}]({image_url})\n\n"
+    "**Why it made the list**\n\n{reasoning_summary}\n\n"
+    "- **Price:** {price}\n- **Condition:** {condition}\n"
+)
+
+PROS_CONS_TEMPLATE = (
+    "\n\n<details>\n"
+    "<summary><strong>Pros ✅ / Cons ⚠️</strong></summary>\n\n"
+    "| Pros | Cons |\n|---|---|\n"
+    "| {pros} | {cons} |\n\n"
+    "</details>\n\n"
+)
+
+
+@functools.cache
+def get_agent() -> "MercariShoppingAgent":
+    """Create the agent on first use; every session shares it and its Anthropic client.
+
+    Returns:
+        MercariShoppingAgent: The agent.
+    """
+    # the agent pulls in the Anthropic SDK, so only load it when the first request arrives
+    from anthropic import AsyncAnthropic  # noqa: PLC0415
+
+    from app.agent import MercariShoppingAgent  # noqa: PLC0415
+
+    client = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    return MercariShoppingAgent(client=client, model=os.getenv("MODEL_NAME", "claude-3-5-sonnet-latest"))
+
+
+def escape_code_fence(text: str) -> str:
+    """Break up backtick runs so the text can be shown inside a fenced code block.
+
+    Args:
+        text (str): The text to escape.
+
+    Returns:
+        str: The escaped text.
+    """
+    return CODE_FENCE_PATTERN.sub(lambda match: " ".join(match.group()), text)
+
+
+def render_recommendation_card(rec: ItemRecommendation, index: int) -> str:
+    """Return the Markdown card of a single recommendation.
+
+    Args:
+        rec (ItemRecommendation): The recommendation to render.
+        index (int): The 1-based position of the recommendation.
+
+    Returns:
+        str: The Markdown card.
+    """
+    item = rec.item
+    detail = item.item_detail
+    trust_signals = rec.trust_signals
+    market_research_result = item.market_research_result
+    relevance_score = item.relevance_score
+    parts: list[str] = []
+
+    # — Quick-view fields —
+    condition = item.get_condition() or "—"
+
+    price, converted_price = item.get_price()
+    if converted_price:
+        price += f" ({converted_price})"
+
+    # — Card header & hero, why it made the list, quick spec bullets —
+    parts.append(
+        CARD_TEMPLATE.format(
+            index=index,
+            title=rec.title,
+            item_url=item.item_url,
+            persona_fit=rec.persona_fit,
+            name=item.name,
+            image_url=item.image_url,
+            reasoning_summary=rec.reasoning_summary,
+            price=price,
+            condition=condition,
+        )
+    )
+    if detail:
+        parts.append(
+            "- **Seller:** "
+            f"{detail.seller_name} "
+            f"({detail.seller_review_stars}★, "
+            f"{detail.seller_review} reviews, "
+            f"{detail.seller_verification_status})\n"
+        )
+
+    # — Collapsible Pros / Cons table —
+    # Build a two-column table; put each list in its own cell with <br>
+    pros = "<br>".join(rec.pros) if rec.pros else "—"
+    cons = "<br>".join(rec.cons) if rec.cons else "—"
+    parts.append(PROS_CONS_TEMPLATE.format(pros=pros, cons=cons))
+
+    # — Trust signals block —
+    parts.append(
+        f"**Trust & Seller Info**\n- **Seller rating:** {trust_signals.seller_rating}\n- {trust_signals.notes}\n\n"
+    )
+
+    # — Deep-dive accordion (kept from your original) —
+    parts.append("<details>\n<summary>More Details</summary>\n\n")
+    if detail:
+        parts.append("#### Item Details\n")
+        parts.append(f"**Description**\n\n```\n{escape_code_fence(detail.description)}\n```\n")
+        if detail.categories:
+            parts.append(f"**Categories:** {', '.join(detail.categories)}\n\n")
+
+    if market_research_result:
+        parts.append(
+            f"#### Market Research Result\n```\n{escape_code_fence(market_research_result.get_llm_friendly_result())}"
+            "\n```\n\n"
+        )
+
+    if relevance_score:
+        parts.append(
+            "#### Relevance\n"
+            f"**Score:** {relevance_score.score}\n\n"
+            f"**Reasoning**\n\n```\n"
+            f"{escape_code_fence(relevance_score.reasoning)}\n```\n"
+        )
+
+    parts.append("</details>\n\n---\n\n")
+
+    return "".join(parts)
 
 
 def get_item_recommendations_text(
@@ -21,87 +155,24 @@ def get_item_recommendations_text(
 ) -> str:
     """Return shopper-friendly Markdown for a list of ItemRecommendation objects."""
     # ── Header ────────────────────────────────────────────────────────────────
-    text = "## 🎯 Top Picks for You\n"
     if not item_recommendations:
-        return text + "No item recommendations found.\n"
+        return RECOMMENDATIONS_HEADER + "No item recommendations found.\n"
 
-    # ── Card for each recommendation ─────────────────────────────────────────
-    for i, rec in enumerate(item_recommendations, start=1):
-        item = rec.item
-        detail = item.item_detail
-
-        # — Quick-view fields —
-        condition = detail.condition_type if detail and detail.condition_type else item.condition_grade or "—"
-
-        price = f"{item.currency} {item.price}"
-        if detail and detail.converted_price:
-            price += f" ({detail.converted_price})"
-
-        # — Card header & hero —
-        text += f"### {i}. [{rec.title}]({item.item_url})\n"
-        text += f"*{rec.persona_fit}*\n\n"
-        text += f"![{item.name}]({item.image_url})\n\n"
-
-        # — Why it made the list —
-        text += f"**Why it made the list**\n\n{rec.reasoning_summary}\n\n"
-
-        # — Quick spec bullets —
-        text += f"- **Price:** {price}\n- **Condition:** {condition}\n"
-        if detail:
-            text += (
-                "- **Seller:** "
-                f"{detail.seller_name} "
-                f"({detail.seller_review_stars}★, "
-                f"{detail.seller_review} reviews, "
-                f"{detail.seller_verification_status})\n"
-            )
-
-        # — Collapsible Pros / Cons table —
-        text += "\n\n<details>\n"
-        text += "<summary><strong>Pros ✅ / Cons ⚠️</strong></summary>\n\n"
-        # Build a two-column table; put each list in its own cell with <br>
-        pros = "<br>".join(rec.pros) or "—"
-        cons = "<br>".join(rec.cons) or "—"
-        text += "| Pros | Cons |\n|---|---|\n"
-        text += f"| {pros} | {cons} |\n\n"
-        text += "</details>\n\n"
-
-        # — Trust signals block —
-        text += "**Trust & Seller Info**\n"
-        text += f"- **Seller rating:** {rec.trust_signals.seller_rating}\n"
-        text += f"- {rec.trust_signals.notes}\n\n"
-
-        # — Deep-dive accordion (kept from your original) —
-        text += "<details>\n<summary>More Details</summary>\n\n"
-        if detail:
-            text += "#### Item Details\n"
-            text += f"**Description**\n\n```\n{detail.description}\n```\n"
-            if detail.categories:
-                text += f"**Categories:** {', '.join(detail.categories)}\n\n"
-
-        if item.market_research_result:
-            text += "#### Market Research Result\n```\n"
-            text += item.market_research_result.get_llm_friendly_result()
-            text += "\n```\n\n"
-
-        if item.relevance_score:
-            text += (
-                "#### Relevance\n"
-                f"**Score:** {item.relevance_score.score}\n\n"
-                f"**Reasoning**\n\n```\n"
-                f"{item.relevance_score.reasoning}\n```\n"
-            )
+    # collect the fragments and join them once, instead of copying the growing text on every append
+    parts = [RECOMMENDATIONS_HEADER]
 
-        text += "</details>\n\n---\n\n"
-
-    return text
+    # ── Card for each recommendation ─────────────────────────────────────────
+    parts.extend(render_recommendation_card(rec, i) for i, rec in enumerate(item_recommendations, start=1))
+    return "".join(parts)
 
 
 async def interact_with_agent(prompt, messages):
     """Interact with the agent."""
+    import gradio as gr  # noqa: PLC0415
+
     yield messages, "Thinking..."
 
-    async for chunk in agent.run_stream(prompt):
+    async for chunk in get_agent().run_stream(prompt):
         if chunk.action == "reasoning":
             messages.append(gr.ChatMessage(role="assistant", content=chunk.text, metadata={"title": "Thinking"}))
             yield messages, "Thinking..."
@@ -135,7 +206,10 @@ html, body, .gradio-container {height: 100% !important; min-height: 0 !important
 
 async def main():
     """Main function."""
-    with gr.Blocks(css=CSS) as demo:
+    # gradio is heavy to import, so only load it when the app is started
+    import gradio as gr  # noqa: PLC0415
+
+    with gr.Blocks(css=CSS, analytics_enabled=False) as demo:
         with gr.Row(elem_id="app_row"):
             # Left column: Chatbot log (fills height)
             with gr.Column(elem_id="left_col", scale=1):
@@ -150,7 +224,8 @@ async def main():
             search.submit(interact_with_agent, [search, chat], [chat, recommend])
             search_btn.click(interact_with_agent, [search, chat], [chat, recommend], preprocess=False)
 
-    demo.launch()
+    # the queue streams the agent's updates to each session; the server address still comes from GRADIO_SERVER_NAME
+    demo.queue(max_size=32, default_concurrency_limit=8).launch(max_threads=64, show_error=True)
 
 
 if __name__ == "__main__":